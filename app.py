@@ -5,14 +5,30 @@ from database import fetch_raw_tables
 from data_preparation import prepare_full_data
 from filters import apply_filters
 from dashboard_ui import dashboard
-from datetime import datetime
+from datetime import date, datetime
 
 st.set_page_config(page_title="TRSM Intelligence", layout="wide")
 
-@st.cache_data
-def load_data(start=None, end=None):
-    raw = fetch_raw_tables(start, end)
-    return prepare_full_data(raw)
+# Disk-persisted so restarts reuse the prepared frame instead of re-running
+# every query. Streamlit ignores ttl on persisted caches, so only the entry
+# count is bounded; the end date moves daily, which rolls the key anyway.
+@st.cache_data(persist="disk", max_entries=8, show_spinner="Loading TRSM data…")
+def load_data(start: date, end: date):
+    raw  = fetch_raw_tables(start.isoformat(), end.isoformat())
+    df   = prepare_full_data(raw)
+    # label maps come from the small dimension tables, not the joined frame
+    cmap = label_map(raw.get("customers"), "CustomerId", "CustomerName")
+    pmap = label_map(raw.get("products"),  "ProductId",  "ProductName")
+    return df, cmap, pmap
+
+def label_map(tbl, key: str, label: str) -> dict:
+    if tbl is None or tbl.empty:
+        return {}
+    return dict(zip(tbl[key], tbl[label]))
+
+def as_date(d) -> date:
+    """Drop any time part so equivalent picks share one cache key."""
+    return d.date() if isinstance(d, datetime) else d
 
 def main():
     st.title("📊 TRSM Advanced Analytics")
@@ -22,12 +38,8 @@ def main():
     max_d = st.sidebar.date_input("End Date",   value=datetime.today())
 
     # — Load and prepare —
-    df_all = load_data(min_d.strftime("%Y-%m-%d"), max_d.strftime("%Y-%m-%d"))
-    df     = apply_filters(df_all)
-
-    # — Mapping dicts for dashboard labels —
-    cmap = df_all.set_index("CustomerId")["CustomerName"].to_dict()
-    pmap = df_all.set_index("ProductId")["ProductName"].to_dict()
+    df_all, cmap, pmap = load_data(as_date(min_d), as_date(max_d))
+    df = apply_filters(df_all)
 
     if df.empty:
         st.warning("⚠️ No data for the selected date range.")
@@ -6,8 +6,10 @@ import tabs.kpis as tab0, tabs.trend as tab1, tabs.regional as tab2
 import tabs.customers as tab3, tabs.products as tab4, tabs.suppliers as tab5
 
 def dashboard(df_all, df, cmap, pmap):
-    df['CustomerName']=df.CustomerId.map(cmap)
-    df['ProductName']=df.ProductId.map(pmap)
+    # names already arrive (as categories) from the joined frame; the maps
+    # only fill them in when a lookup table was unavailable
+    if 'CustomerName' not in df: df['CustomerName']=df.CustomerId.map(cmap)
+    if 'ProductName' not in df: df['ProductName']=df.ProductId.map(pmap)
     tabs=st.tabs(["KPIs","Trend","Regional","Customers","Products","Suppliers"])
     with tabs[0]: tab0.render(df_all,df)
     with tabs[1]: tab1.render(df)
@@ -6,6 +6,25 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+def _factorize_shared(col: str, *frames: pd.DataFrame) -> np.ndarray:
+    """
+    Replace `col` in every frame with int32 codes from one shared uniques
+    index, so equality joins line up across frames. Nulls become -1.
+    Returns the uniques, for decoding the codes back to the original IDs.
+    """
+    values = np.concatenate([f[col].to_numpy() for f in frames])
+    codes, uniques = pd.factorize(values)
+    splits = np.cumsum([len(f) for f in frames])[:-1]
+    for f, part in zip(frames, np.split(codes.astype(np.int32), splits)):
+        f[col] = part
+    return uniques
+
+def _as_datetime(s):
+    """Parse with pd.to_datetime only when the driver didn't already return datetime64."""
+    if s is not None and pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, errors="coerce")
+
 def prepare_full_data(raw: dict) -> pd.DataFrame:
     """
     Merge raw tables, compute Revenue, Cost, Profit, and delivery metrics.
@@ -18,8 +37,19 @@ def prepare_full_data(raw: dict) -> pd.DataFrame:
     if "order_lines" not in raw or raw["order_lines"] is None:
         raise RuntimeError("Missing 'order_lines' in raw data. Cannot continue.")
 
-    orders_df = raw["orders"]
-    lines_df  = raw["order_lines"]
+    # keep only the columns the pipeline & tabs read, as independent shallow
+    # copies so the (cached) raw tables are never mutated by the key writes
+    def keep(df, cols):
+        return df.loc[:, [c for c in cols if c in df.columns]].copy(deep=False)
+
+    orders_df = keep(raw["orders"], [
+        "OrderId","CustomerId","SalesRepId","CreatedAt_order",
+        "DateExpected","ShipDate","ShippingMethodRequested",
+    ])
+    lines_df  = keep(raw["order_lines"], [
+        "OrderLineId","OrderId","ProductId","ShipperId",
+        "QuantityShipped","SalePrice","UnitCost",
+    ])
 
     # 2) FAIL FAST if no order‐lines
     if lines_df.empty:
@@ -28,69 +58,76 @@ def prepare_full_data(raw: dict) -> pd.DataFrame:
             "Check your date filters or database permissions."
         )
 
-    # 3) CAST join keys to string, with presence checks
-    def cast(df, col):
-        if col not in df.columns:
-            raise RuntimeError(f"Expected '{col}' in DataFrame but got {df.columns.tolist()}")
-        df[col] = df[col].astype(str)
-
-    for df, cols in [
-        (orders_df, ["OrderId", "CustomerId", "SalesRepId", "ShippingMethodRequested"]),
-        (lines_df,  ["OrderLineId", "OrderId", "ProductId", "ShipperId"])
-    ]:
-        for c in cols:
-            cast(df, c)
-
-    # 4) INNER JOIN orders ↔ order_lines
-    df = lines_df.merge(
-        orders_df,
-        on="OrderId",
-        how="inner",
-        suffixes=("", "_ord")
-    )
-    logger.info(f"After joining orders+lines: {len(df):,} rows")
-
-    # 5) LOOKUP merges (only if present & non‐empty)
+    # 3) LOOKUP tables (only if present & non‐empty)
     lookups = {
-        "customers":    ("CustomerId",         ["CustomerId","RegionId","CustomerName"], raw.get("customers")),
-        "products":     ("ProductId",          ["ProductId","SupplierId","ProductName","ProductListPrice","CostPrice"], raw.get("products")),
-        "regions":      ("RegionId",           ["RegionId","RegionName"], raw.get("regions")),
-        "shippers":     ("ShipperId",          ["ShipperId","Carrier"], raw.get("shippers")),
-        "suppliers":    ("SupplierId",         ["SupplierId","SupplierName"], raw.get("suppliers")),
+        "customers":    ("CustomerId",              ["CustomerId","CustomerName","RegionId","IsRetail"], raw.get("customers")),
+        "products":     ("ProductId",               ["ProductId","SKU","ProductName","UnitOfBillingId","SupplierId"], raw.get("products")),
+        "regions":      ("RegionId",                ["RegionId","RegionName"], raw.get("regions")),
+        "shippers":     ("ShipperId",               ["ShipperId","Carrier"], raw.get("shippers")),
+        "suppliers":    ("SupplierId",              ["SupplierId","SupplierName"], raw.get("suppliers")),
         "smethods":     ("ShippingMethodRequested", ["ShippingMethodRequested","ShippingMethodName"], raw.get("shipping_methods")),
     }
-
-    for name, (keycol, required_cols, lookup_df) in lookups.items():
+    tables = {}
+    for name, (keycol, cols, lookup_df) in lookups.items():
         if lookup_df is None or lookup_df.empty:
             logger.warning(f"Lookup table '{name}' is missing or empty—skipping merge.")
             continue
-
         # prepare shipping methods rename
         if name == "smethods" and "SMId" in lookup_df.columns:
             lookup_df = lookup_df.rename(columns={"SMId": "ShippingMethodRequested"})
+        tables[name] = keep(lookup_df, cols)
+
+    # packs arrive pre-aggregated per OrderLineId from the database
+    packs = raw.get("packs")
+    if packs is not None and not packs.empty:
+        packs = packs.copy(deep=False)
+    else:
+        packs = None
 
-        for col in required_cols:
-            cast(lookup_df, col)
+    # 4) FACTORIZE join keys into shared int32 codes, with presence checks
+    def require(df, col):
+        if col not in df.columns:
+            raise RuntimeError(f"Expected '{col}' in DataFrame but got {df.columns.tolist()}")
+
+    key_frames = {
+        "OrderId":                 [orders_df, lines_df],
+        "CustomerId":              [orders_df, tables.get("customers")],
+        "ProductId":               [lines_df, tables.get("products")],
+        "ShipperId":               [lines_df, tables.get("shippers")],
+        "RegionId":                [tables.get("customers"), tables.get("regions")],
+        "SupplierId":              [tables.get("products"), tables.get("suppliers")],
+        "ShippingMethodRequested": [orders_df, tables.get("smethods")],
+        "OrderLineId":             [lines_df, packs],
+    }
+    key_uniques = {}
+    for col, frames in key_frames.items():
+        frames = [f for f in frames if f is not None]
+        for f in frames:
+            require(f, col)
+        key_uniques[col] = _factorize_shared(col, *frames)
+
+    # 5) INNER JOIN orders ↔ order_lines
+    df = lines_df.merge(
+        orders_df,
+        on="OrderId",
+        how="inner",
+        suffixes=("", "_ord")
+    )
+    logger.info(f"After joining orders+lines: {len(df):,} rows")
 
-        df = df.merge(lookup_df, on=keycol, how="left")
+    # 6) LOOKUP joins — dimension tables are indexed on their key, so only the
+    #    small side is hashed; m:1 guards against duplicate keys fanning out rows
+    for name, lookup_df in tables.items():
+        keycol = lookups[name][0]
+        df = df.join(lookup_df.set_index(keycol), on=keycol, how="left", validate="m:1")
         logger.info(f"After merging '{name}': {len(df):,} rows")
 
-    # 6) PACKS aggregation (optional)
-    packs = raw.get("packs")
-    if packs is not None and not packs.empty:
-        packs = packs.copy()
-        cast(packs, "PickedForOrderLine")
-        packs["OrderLineId"] = packs["PickedForOrderLine"]
-        psum = (
-            packs.groupby("OrderLineId", as_index=False)
-            .agg(
-                WeightLb     = ("WeightLb", "sum"),
-                ItemCount    = ("ItemCount","sum"),
-                DeliveryDate = ("DeliveryDate","max")
-            )
+    # 7) PACKS totals (optional)
+    if packs is not None:
+        df = df.merge(
+            packs[["OrderLineId","WeightLb","ItemCount","DeliveryDate"]],
+            on="OrderLineId", how="left"
         )
-        cast(psum, "OrderLineId")
-        df = df.merge(psum, on="OrderLineId", how="left")
         df[["WeightLb","ItemCount"]] = df[["WeightLb","ItemCount"]].fillna(0)
         logger.info(f"After merging 'packs': {len(df):,} rows")
     else:
@@ -99,11 +136,17 @@ def prepare_full_data(raw: dict) -> pd.DataFrame:
         df["ItemCount"]   = 0.0
         df["DeliveryDate"]= pd.NaT
 
-    # 7) NUMERIC columns — coerce & fill
+    # 8) NUMERIC columns — coerce & fill
     numeric_cols = ["QuantityShipped","SalePrice","UnitCost","WeightLb","ItemCount"]
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    df[numeric_cols] = pd.DataFrame(
+        {
+            c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float32, na_value=0.0)
+            for c in numeric_cols
+        },
+        index=df.index,
+    )
 
-    # 8) SHIPPED WEIGHT logic
+    # 9) SHIPPED WEIGHT logic
     per_item = df["WeightLb"] / df["ItemCount"].replace(0, np.nan)
     is_wt = (df["UnitOfBillingId"] == 3) & (df["WeightLb"] > 0)
     df["ShippedWeightLb"] = np.where(
@@ -112,30 +155,51 @@ def prepare_full_data(raw: dict) -> pd.DataFrame:
         df["ItemCount"] * per_item.fillna(0)
     )
 
-    # 9) REVENUE, COST, PROFIT
-    df["Revenue"] = np.where(
-        is_wt,
-        df["WeightLb"] * df["SalePrice"],
-        df["ItemCount"] * df["SalePrice"]
-    )
-    df["Cost"]    = np.where(
-        is_wt,
-        df["WeightLb"] * df["UnitCost"],
-        df["ItemCount"] * df["UnitCost"]
-    )
+    # 10) REVENUE, COST, PROFIT
+    # billed quantity is picked once; price and cost then share it
+    # (products are taken in float64 so large line totals do not round)
+    qty = np.where(is_wt.to_numpy(), df["WeightLb"].to_numpy(), df["ItemCount"].to_numpy())
+    df["Revenue"] = qty * df["SalePrice"].to_numpy(dtype=np.float64)
+    df["Cost"]    = qty * df["UnitCost"].to_numpy(dtype=np.float64)
     df["Profit"]  = df["Revenue"] - df["Cost"]
 
-    # 10) DATE & DELIVERY METRICS
-    df["Date"]         = pd.to_datetime(df["CreatedAt_order"], errors="coerce").dt.normalize()
-    df["ShipDate"]     = pd.to_datetime(df["ShipDate"], errors="coerce")
-    df["DeliveryDate"] = pd.to_datetime(df["DeliveryDate"], errors="coerce")
-    df["DateExpected"]= pd.to_datetime(df.get("DateExpected"), errors="coerce")
-
-    df["TransitDays"] = (df["DeliveryDate"] - df["ShipDate"]).dt.days.clip(lower=0)
-    df["DeliveryStatus"] = np.where(
-        df["DeliveryDate"] <= df["DateExpected"],
-        "On Time", "Late"
+    # 11) DATE & DELIVERY METRICS
+    created            = _as_datetime(df["CreatedAt_order"])
+    # day floor as a plain datetime64 cast for naive columns (no per-element
+    # normalize); tz-aware ones (e.g. datetimeoffset) keep .dt.normalize()
+    if created.dt.tz is None:
+        df["Date"]     = created.to_numpy().astype("datetime64[D]").astype(created.dtype)
+        wall_date      = df["Date"]
+    else:
+        df["Date"]     = created.dt.normalize()
+        wall_date      = df["Date"].dt.tz_localize(None)
+    df["ShipDate"]     = _as_datetime(df["ShipDate"])
+    df["DeliveryDate"] = _as_datetime(df["DeliveryDate"])
+    df["DateExpected"]= _as_datetime(df.get("DateExpected"))
+    # month bucket, floored once here rather than on every tab rerun
+    df["Month"]        = wall_date.to_numpy().astype("datetime64[M]")
+
+    # float32 rather than an int type: undelivered lines keep NaN
+    df["TransitDays"] = (
+        (df["DeliveryDate"] - df["ShipDate"]).dt.days.clip(lower=0).astype(np.float32)
     )
+    # code 1 = Late; a missing date never compares <=, so it stays Late
+    late = ~(df["DeliveryDate"] <= df["DateExpected"]).to_numpy()
+    df["DeliveryStatus"] = pd.Categorical.from_codes(
+        late.astype(np.int8), categories=["On Time","Late"]
+    )
+
+    # 12) DECODE join keys back to their original ID values
+    for col, uniques in key_uniques.items():
+        if col in df.columns:
+            codes = df[col].fillna(-1).to_numpy(dtype=np.int64)
+            df[col] = pd.api.extensions.take(uniques, codes, allow_fill=True)
+
+    # 13) LOW‐CARDINALITY labels → category, so groupbys hash int codes
+    for col in ["CustomerName","ProductName","RegionName","Carrier",
+                "SupplierName","ShippingMethodName"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
 
     logger.info(f"Prepared full data: {len(df):,} rows")
     return df
\ No newline at end of file
@@ -5,12 +5,20 @@ from pathlib import Path
 import os
 import datetime
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from urllib.parse import quote_plus
 
 import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 
+try:
+    import connectorx as cx
+except ImportError:  # fall back to pd.read_sql through SQLAlchemy
+    cx = None
+
 # ─── Load .env ────────────────────────────────────────────────────────────────
 env_path = Path(__file__).parent / ".env"
 if env_path.exists():
@@ -24,9 +32,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ─── Engine factory ────────────────────────────────────────────────────────────
-@lru_cache(maxsize=1)
-def get_engine():
+# ─── Credentials ──────────────────────────────────────────────────────────────
+def get_credentials():
     server   = os.getenv("DB_SERVER")
     database = os.getenv("DB_NAME")
     user     = os.getenv("DB_USER")
@@ -37,6 +44,12 @@ def get_engine():
             "🚨 Database credentials not fully set! "
             "Please define DB_SERVER, DB_NAME, DB_USER & DB_PASS in your environment or .env"
         )
+    return server, database, user, pwd
+
+# ─── Engine factory ────────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def get_engine():
+    server, database, user, pwd = get_credentials()
 
     conn_str = f"mssql+pymssql://{user}:{pwd}@{server}/{database}"
 
@@ -44,7 +57,7 @@ def get_engine():
         engine = create_engine(
             conn_str,
             pool_pre_ping=True,
-            pool_size=5,
+            pool_size=10,
             max_overflow=10,
         )
         # quick smoke-test
@@ -62,6 +75,35 @@ def get_engine():
         raise RuntimeError(f"🚨 Unexpected error initializing the DB engine: {e}") from e
 
 
+# ─── Arrow reader (connectorx) ─────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def get_arrow_uri():
+    server, database, user, pwd = get_credentials()
+    return f"mssql://{quote_plus(user)}:{quote_plus(pwd)}@{server}/{database}"
+
+def render_sql(qry, params: dict) -> str:
+    """Inline the :start/:end date params, since connectorx takes plain SQL."""
+    # params are dates only; round-trip them through date() so nothing else gets spliced in
+    dates = {k: datetime.date.fromisoformat(str(v)[:10]).isoformat() for k, v in params.items()}
+
+    def sub(m):
+        name = m.group(1)
+        return f"'{dates[name]}'" if name in dates else m.group(0)
+
+    return re.sub(r":(\w+)\b", sub, str(qry))
+
+def read_table(qry, engine, params: dict) -> pd.DataFrame:
+    """Read one query as Arrow columns when connectorx is available."""
+    if cx is not None:
+        try:
+            return cx.read_sql(get_arrow_uri(), render_sql(qry, params), return_type="arrow").to_pandas()
+        except Exception as e:
+            # driver/TLS/type-mapping problems: retry through pymssql rather
+            # than handing back an empty table
+            logger.warning(f"connectorx read failed, retrying via SQLAlchemy: {e}")
+    return pd.read_sql(qry, engine, params=params)
+
+
 # ─── Data fetcher ──────────────────────────────────────────────────────────────
 @lru_cache(maxsize=32)
 def fetch_raw_tables(start_date: str = "2020-01-01", end_date: str = None) -> dict:
@@ -105,23 +147,29 @@ def fetch_raw_tables(start_date: str = "2020-01-01", end_date: str = None) -> di
                   FROM dbo.OrderLines
                  WHERE CreatedAt BETWEEN :start AND :end
             )
-            SELECT p.PickedForOrderLine, p.WeightLb, p.ItemCount,
-                   p.ShippedAt AS DeliveryDate
+            SELECT p.PickedForOrderLine AS OrderLineId,
+                   SUM(p.WeightLb)  AS WeightLb,
+                   SUM(p.ItemCount) AS ItemCount,
+                   MAX(p.ShippedAt) AS DeliveryDate
               FROM dbo.Packs p
               JOIN ol ON p.PickedForOrderLine = ol.OrderLineId
+             GROUP BY p.PickedForOrderLine
         """),
     }
 
-    # initialize every key to an empty DataFrame
-    raw = {name: pd.DataFrame() for name in queries.keys()}
-
-    for name, qry in queries.items():
+    def fetch(name, qry):
         try:
-            df = pd.read_sql(qry, engine, params=params)
+            df = read_table(qry, engine, params)
             logger.debug(f"Fetched '{name}': {len(df)} rows")
-            raw[name] = df
-        except SQLAlchemyError as e:
+            return df
+        except (SQLAlchemyError, RuntimeError) as e:
             logger.error(f"Error fetching '{name}': {e}")
-            # raw[name] stays as empty DataFrame
+            # failed tables come back as an empty DataFrame
+            return pd.DataFrame()
+
+    # one connection per query, so the round-trips overlap instead of queueing
+    with ThreadPoolExecutor(max_workers=len(queries)) as ex:
+        futures = {name: ex.submit(fetch, name, qry) for name, qry in queries.items()}
+        raw = {name: fut.result() for name, fut in futures.items()}
 
     return raw
\ No newline at end of file
@@ -6,46 +6,71 @@ import numpy as np
 import plotly.express as px
 
 from utils import (
-    filter_by_date,
     compute_interpurchase,
     seasonality_heatmap_data,
     display_seasonality_heatmap,
 )
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+
+# ─── HELPERS ─────────────────────────────────────────────────────────────────
+
+def count_unique(s: pd.Series) -> int:
+    """nunique that only walks the integer codes when s is categorical."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return len(s.cat.remove_unused_categories().cat.categories)
+    return s.nunique()
 
 # ─── CACHED COMPUTATIONS ─────────────────────────────────────────────────────
 
 @st.cache_data
-def compute_rfm(df: pd.DataFrame) -> pd.DataFrame:
-    now = df.Date.max()
-    agg = (
-        df.groupby("CustomerName")
+def compute_customer_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per customer: last purchase, order count and revenue."""
+    return (
+        df.groupby("CustomerName", observed=True, sort=False)
           .agg(
-              Recency   = ("Date", lambda x: (now - x.max()).days),
-              Frequency = ("OrderId", "nunique"),
-              Monetary  = ("Revenue", "sum"),
+              LastDate = ("Date", "max"),
+              Orders   = ("OrderId", "nunique"),
+              Revenue  = ("Revenue", "sum"),
           )
           .reset_index()
     )
+
+@st.cache_data
+def compute_rfm(cust: pd.DataFrame, now: pd.Timestamp) -> pd.DataFrame:
+    # `now` is the newest date over all filtered rows, unnamed customers included
+    agg = pd.DataFrame({
+        "CustomerName": cust.CustomerName,
+        "Recency":      (now - cust.LastDate).dt.days,
+        "Frequency":    cust.Orders,
+        "Monetary":     cust.Revenue,
+    })
     agg["R"]   = pd.qcut(agg.Recency,   4, labels=[4,3,2,1]).astype(int)
     agg["F"]   = pd.qcut(agg.Frequency, 4, labels=[1,2,3,4]).astype(int)
     agg["M"]   = pd.qcut(agg.Monetary,  4, labels=[1,2,3,4]).astype(int)
     agg["RFM"] = agg.R.map(str) + agg.F.map(str) + agg.M.map(str)
     return agg
 
+@st.cache_data
+def compute_rfm_clusters(x: np.ndarray, k: int = 4) -> np.ndarray:
+    """Z-score the RFM columns (population std, as StandardScaler) and cluster."""
+    std = x.std(axis=0)
+    z = (x - x.mean(axis=0)) / np.where(std == 0, 1.0, std)
+    return MiniBatchKMeans(
+        n_clusters=k, batch_size=512, n_init=3, random_state=42
+    ).fit_predict(z)
+
 @st.cache_data
 def compute_cohort_retention(df: pd.DataFrame) -> pd.DataFrame:
-    df2 = df.copy()
-    df2["CohortMonth"] = df2.Date.dt.to_period("M").dt.to_timestamp()
-    first = df2.groupby("CustomerName")["CohortMonth"].min().rename("First")
-    df2 = df2.join(first, on="CustomerName")
-    df2["Period"] = (
-        (df2.CohortMonth.dt.year - df2.First.dt.year)*12 +
-        (df2.CohortMonth.dt.month - df2.First.dt.month)
-    )
+    # month ordinals (months since epoch) straight off the datetime64 buffer
+    cohort_month = df.Month.to_numpy().astype("datetime64[M]").astype("i4")
+    # customers as int codes; unnamed rows (-1) are left out, as groupby would
+    df2 = pd.DataFrame({"Customer": pd.factorize(df.CustomerName)[0], "CohortMonth": cohort_month})
+    df2 = df2[df2.Customer >= 0]
+    first = df2.groupby("Customer", sort=False)["CohortMonth"].transform("min").to_numpy()
+    df2["First"]  = first.astype("datetime64[M]")
+    df2["Period"] = df2.CohortMonth.to_numpy() - first
     counts = (
-        df2.groupby(["First","Period"])["CustomerName"]
+        df2.groupby(["First","Period"], sort=False)["Customer"]
            .nunique()
            .reset_index(name="Count")
     )
@@ -62,16 +87,17 @@ def compute_cohort_retention(df: pd.DataFrame) -> pd.DataFrame:
 def render(df: pd.DataFrame):
     st.subheader("👥 Customer Intelligence")
 
-    # Data prep
-    df = df.copy()
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    df.dropna(subset=['Date'], inplace=True)
+    # Data prep — no full-frame copy; the cached frame is only ever sliced
+    date_col = df["Date"]
+    parse_dates = not pd.api.types.is_datetime64_any_dtype(date_col)
+    if parse_dates:
+        date_col = pd.to_datetime(date_col, errors="coerce")
 
     # Sidebar filters
     with st.sidebar.expander("🔧 Filters", expanded=True):
         date_range = st.date_input(
             "Date Range",
-            [df.Date.min().date(), df.Date.max().date()],
+            [date_col.min().date(), date_col.max().date()],
             key="cust_date"
         )
         regions  = ["All"] + sorted(df.RegionName.dropna().unique())
@@ -79,20 +105,23 @@ def render(df: pd.DataFrame):
         sel_regs  = st.multiselect("Regions",  regions,  default=["All"], key="cust_regs")
         sel_prods = st.multiselect("Products", products, default=["All"], key="cust_prods")
 
-    # Apply filters
+    # Apply filters — one mask, one slice
     start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-    dfc = filter_by_date(df, start, end)
+    mask = date_col.notna() & (date_col >= start) & (date_col <= end)
     if "All" not in sel_regs:
-        dfc = dfc[dfc.RegionName.isin(sel_regs)]
+        mask &= df.RegionName.isin(sel_regs)
     if "All" not in sel_prods:
-        dfc = dfc[dfc.ProductName.isin(sel_prods)]
+        mask &= df.ProductName.isin(sel_prods)
+    dfc = df.loc[mask]
+    if parse_dates:
+        dfc = dfc.assign(Date=date_col[mask])
 
     if dfc.empty:
         st.warning("⚠️ No data for those filters.")
         return
 
     # KPI cards
-    total_cust   = dfc.CustomerName.nunique()
+    total_cust   = count_unique(dfc.CustomerName)
     total_rev    = dfc.Revenue.sum()
     total_ord    = dfc.OrderId.nunique()
     avg_order    = total_rev / total_ord if total_ord else 0
@@ -105,19 +134,18 @@ def render(df: pd.DataFrame):
     st.markdown("---")
 
     # New / Active / Cumulative
-    dfc["Month"] = dfc.Date.dt.to_period("M").dt.to_timestamp()
     active = (
         dfc.groupby("Month")["CustomerName"]
            .nunique()
            .reset_index(name="Active")
     )
     first_order = (
-        dfc.groupby("CustomerName")["Month"]
+        dfc.groupby("CustomerName", observed=True, sort=False)["Month"]
            .min()
            .reset_index(name="FirstMonth")
     )
     new = (
-        first_order.groupby("FirstMonth")["CustomerName"]
+        first_order.groupby("FirstMonth", sort=False)["CustomerName"]
                    .nunique()
                    .reset_index(name="New")
                    .rename(columns={"FirstMonth":"Month"})
@@ -128,15 +156,21 @@ def render(df: pd.DataFrame):
     )
     summary_mon["Cumulative"] = summary_mon.New.cumsum()
 
-    # Churn rate
-    sets = dfc.groupby("Month")["CustomerName"].agg(set)
-    churn_list = []
-    months = list(sets.index)
-    for prev, curr in zip(months, months[1:]):
-        p, c = sets[prev], sets[curr]
-        rate = 100 * (1 - len(c & p)/len(p)) if p else np.nan
-        churn_list.append({"Month": curr, "ChurnRate": rate})
-    churn_df = pd.DataFrame(churn_list)
+    # Churn rate — unique (month, customer) code pairs; a customer is retained
+    # when the same pair also exists for the previous active month
+    month_idx, months = pd.factorize(dfc.Month, sort=True)
+    pairs = pd.DataFrame({
+        "m": month_idx,
+        "c": pd.factorize(dfc.CustomerName)[0],
+    }).drop_duplicates()
+    active_n = pairs.groupby("m", sort=False).size()
+    retained = pairs.merge(pairs.assign(m=pairs.m + 1), on=["m","c"]).groupby("m", sort=False).size()
+    curr = np.arange(1, len(months))
+    churn_df = pd.DataFrame({
+        "Month":     months[1:],
+        "ChurnRate": 100 * (1 - retained.reindex(curr, fill_value=0).to_numpy()
+                                / active_n.reindex(curr - 1).to_numpy()),
+    })
 
     st.plotly_chart(
         px.bar(summary_mon, x="Month", y=["New","Active"], title="New vs Active Customers"),
@@ -152,8 +186,9 @@ def render(df: pd.DataFrame):
     )
     st.markdown("---")
 
-    # CLV & Inter-purchase
-    clv = dfc.groupby("CustomerName")["Revenue"].sum().reset_index(name="CLV")
+    # CLV & Inter-purchase — per-customer totals feed both CLV and RFM
+    cust = compute_customer_summary(dfc)
+    clv  = cust[["CustomerName","Revenue"]].rename(columns={"Revenue":"CLV"})
     diffs = compute_interpurchase(dfc)
     col1, col2 = st.columns(2)
     col1.plotly_chart(
@@ -169,7 +204,7 @@ def render(df: pd.DataFrame):
     st.markdown("---")
 
     # RFM & Clustering
-    rfm = compute_rfm(dfc)
+    rfm = compute_rfm(cust, dfc.Date.max())
     st.plotly_chart(
         px.scatter(rfm, x="Recency", y="Monetary", size="Frequency",
                    color="RFM", hover_name="CustomerName", title="RFM Segmentation"),
@@ -185,8 +220,8 @@ def render(df: pd.DataFrame):
         px.pie(seg_counts, names="RFM", values="Count", title="RFM Segment Mix"),
         use_container_width=True
     )
-    X = StandardScaler().fit_transform(rfm[["Recency","Frequency","Monetary"]])
-    rfm["Cluster"] = KMeans(n_clusters=4, random_state=42).fit_predict(X).astype(str)
+    X = rfm[["Recency","Frequency","Monetary"]].to_numpy(dtype=np.float64)
+    rfm["Cluster"] = compute_rfm_clusters(X).astype(str)
     st.plotly_chart(
         px.scatter(rfm, x="Recency", y="Frequency", size="Monetary",
                    color="Cluster", hover_name="CustomerName", title="RFM Clusters"),
@@ -204,13 +239,15 @@ def render(df: pd.DataFrame):
         customer_drilldown(dfc)
     st.markdown("---")
 
-    # CSV download
-    st.download_button(
-        "📥 Download Filtered Customer Data",
-        data=dfc.to_csv(index=False),
-        file_name="customers_filtered.csv",
-        mime="text/csv"
-    )
+    # CSV download — only serialized on the rerun where it was requested
+    if st.button("📄 Prepare Customer Data CSV", key="cust_csv_prep"):
+        st.download_button(
+            "📥 Download Filtered Customer Data",
+            data=dfc.to_csv(index=False).encode(),
+            file_name="customers_filtered.csv",
+            mime="text/csv",
+            key="cust_csv_dl"
+        )
 
 # ─── TOP-LEVEL DRILL-DOWN FUNCTION ─────────────────────────────────────────────
 
@@ -258,7 +295,7 @@ def customer_drilldown(dfc: pd.DataFrame):
     dfc_c["Mon"] = dfc_c.Date.dt.month_name().str[:3]
     dfc_c["Wd"]  = dfc_c.Date.dt.day_name().str[:3]
     piv = (
-        dfc_c.groupby(["Wd","Mon"])["Revenue"]
+        dfc_c.groupby(["Wd","Mon"], sort=False)["Revenue"]
            .sum().reset_index()
            .pivot("Wd","Mon","Revenue").fillna(0)
     )
@@ -267,8 +304,15 @@ def customer_drilldown(dfc: pd.DataFrame):
                    use_container_width=True)
     st.markdown("---")
 
-    # Top products
-    top_p = dfc_c.groupby("ProductName")["Revenue"].sum().nlargest(10).reset_index()
+    # Top products — linear-time selection of the 10 largest, then sort only those
+    prod_rev = dfc_c.groupby("ProductName", observed=True, sort=False)["Revenue"].sum()
+    vals, names = prod_rev.to_numpy(), prod_rev.index.to_numpy()
+    k = min(10, len(vals))
+    idx = np.argpartition(-vals, k - 1)[:k] if k else np.arange(0)
+    top_p = (
+        pd.DataFrame({"ProductName": names[idx], "Revenue": vals[idx]})
+          .sort_values("Revenue", ascending=False)
+    )
     st.plotly_chart(px.bar(top_p, x="Revenue", y="ProductName", orientation="h",
                            title="Top 10 Products"),
                    use_container_width=True)
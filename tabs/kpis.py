@@ -12,8 +12,8 @@ def compute_monthly_revenue(df: pd.DataFrame) -> pd.DataFrame:
 @st.cache_data
 def compute_breakdowns(df: pd.DataFrame) -> dict:
     return {
-        'ByRegion': df.groupby('RegionName')['Revenue'].sum().reset_index(),
-        'ByShipMethod': df.groupby('ShippingMethodName')['Revenue'].sum().reset_index(),
+        'ByRegion': df.groupby('RegionName', observed=True)['Revenue'].sum().reset_index(),
+        'ByShipMethod': df.groupby('ShippingMethodName', observed=True)['Revenue'].sum().reset_index(),
         'ByCustomerType': df.groupby(df['IsRetail'].map({True:'Retail',False:'Non-Retail'}))['Revenue'].sum().reset_index()
     }
 
@@ -92,6 +92,6 @@ def render(df_all: pd.DataFrame, df: pd.DataFrame):
         ('ProductName','Top 10 Products by Revenue')
     ]:
         with st.expander(title, expanded=False):
-            top = df.groupby(col)['Revenue'].sum().nlargest(10).reset_index()
+            top = df.groupby(col, observed=True)['Revenue'].sum().nlargest(10).reset_index()
             fig_t = px.bar(top, x='Revenue', y=col, orientation='h', text_auto=',.0f')
             st.plotly_chart(fig_t, use_container_width=True)
\ No newline at end of file
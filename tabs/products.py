@@ -21,7 +21,7 @@ from sklearn.cluster import KMeans
 def summarize_products(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate revenue, units, and profit by product."""
     return (
-        df.groupby("ProductName", as_index=False)
+        df.groupby("ProductName", as_index=False, observed=True)
           .agg(
               Revenue=("Revenue", "sum"),
               Units  =("ItemCount", "sum"),
@@ -292,7 +292,7 @@ def product_drilldown(dfp: pd.DataFrame):
 
     # Top customers
     top_c = (
-        pf.groupby("CustomerName")
+        pf.groupby("CustomerName", observed=True)
           .agg(Spend=("Revenue","sum"), Orders=("OrderId","nunique"))
           .nlargest(10,"Spend").reset_index()
     )
@@ -306,7 +306,7 @@ def product_drilldown(dfp: pd.DataFrame):
     # Co-purchase
     orders = pf.OrderId.unique()
     co = dfp[dfp.OrderId.isin(orders) & (dfp.ProductName != choice)]
-    co_top = co.ProductName.value_counts().nlargest(10).reset_index()
+    co_top = co.ProductName.value_counts().loc[lambda s: s > 0].nlargest(10).reset_index()
     co_top.columns = ["ProductName","Count"]
     st.plotly_chart(
         px.bar(co_top, x="Count", y="ProductName", orientation="h",
@@ -22,7 +22,7 @@ def summarize_regions(df: pd.DataFrame, col: str) -> pd.DataFrame:
     """
     Aggregate primary metric and related KPIs by region.
     """
-    agg = df.groupby("RegionName").agg(
+    agg = df.groupby("RegionName", observed=True).agg(
         Total=(col, "sum"),
         Orders=("OrderId", "nunique"),
         Customers=("CustomerName", "nunique"),
@@ -52,7 +52,6 @@ def render(df: pd.DataFrame):
     df = df.copy()
     df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
     df = df.dropna(subset=["Date"])
-    df["Month"] = df["Date"].dt.to_period("M").dt.to_timestamp()
 
     # — Sidebar filters & settings —
     with st.sidebar.expander("🔧 Filters & Settings", expanded=True):
@@ -152,10 +151,10 @@ def render(df: pd.DataFrame):
             st.markdown("### Year-over-Year % Δ")
             yoy = (
                 df_f.assign(Year=df_f.Date.dt.year)
-                    .groupby(["Year","RegionName"])[col].sum()
+                    .groupby(["Year","RegionName"], observed=True)[col].sum()
                     .reset_index()
             )
-            yoy["YoY%"] = yoy.groupby("RegionName")[col].pct_change() * 100
+            yoy["YoY%"] = yoy.groupby("RegionName", observed=True)[col].pct_change() * 100
             latest_year = yoy.Year.max()
             top_yoy = yoy[yoy.Year==latest_year].nlargest(10, "YoY%")
             fig_yoy = px.bar(
@@ -238,12 +237,12 @@ def render(df: pd.DataFrame):
             p1, p2 = st.columns(2)
             with p1:
                 st.markdown("**Top Products**")
-                top_p = sub.groupby("ProductName")[col].sum().nlargest(10).reset_index()
+                top_p = sub.groupby("ProductName", observed=True)[col].sum().nlargest(10).reset_index()
                 fig_p = px.bar(top_p, x=col, y="ProductName", orientation="h")
                 st.plotly_chart(fig_p, use_container_width=True)
             with p2:
                 st.markdown("**Top Customers**")
-                top_c = sub.groupby("CustomerName")[col].sum().nlargest(10).reset_index()
+                top_c = sub.groupby("CustomerName", observed=True)[col].sum().nlargest(10).reset_index()
                 fig_c = px.bar(top_c, x=col, y="CustomerName", orientation="h")
                 st.plotly_chart(fig_c, use_container_width=True)
 
@@ -256,7 +255,7 @@ def render(df: pd.DataFrame):
                     st.plotly_chart(fig_td, use_container_width=True)
             with s2:
                 st.markdown("**Shipping Methods**")
-                ship = sub.groupby("ShippingMethodName")[col].sum().reset_index()
+                ship = sub.groupby("ShippingMethodName", observed=True)[col].sum().reset_index()
                 fig_sm = px.pie(ship, names="ShippingMethodName", values=col, hole=0.4)
                 st.plotly_chart(fig_sm, use_container_width=True)
 
@@ -23,11 +23,11 @@ def compute_volatility(df: pd.DataFrame, metric: str = "Revenue", freq: str = "M
     """
     ts = (
         df
-        .groupby([pd.Grouper(key="Date", freq=freq), "SupplierName"])[metric]
+        .groupby([pd.Grouper(key="Date", freq=freq), "SupplierName"], observed=True)[metric]
         .sum()
         .reset_index()
     )
-    stats = ts.groupby("SupplierName")[metric].agg(mean="mean", std="std").reset_index()
+    stats = ts.groupby("SupplierName", observed=True)[metric].agg(mean="mean", std="std").reset_index()
     stats["CV"] = stats["std"] / stats["mean"].replace(0, pd.NA)
     return stats
 
@@ -165,7 +165,7 @@ def render(df: pd.DataFrame):
         (["RegionName","SupplierName","ProductName"],  f"{metric} by Region→Supplier→Product"),
         (["RegionName","SupplierName","CustomerName"], f"{metric} by Region→Supplier→Customer")
     ]:
-        treedf = dfs.groupby(path)[metric].sum().reset_index()
+        treedf = dfs.groupby(path, observed=True)[metric].sum().reset_index()
         fig_tm = px.treemap(treedf, path=path, values=metric, title=title)
         st.plotly_chart(fig_tm, use_container_width=True)
         st.markdown("---")
@@ -185,7 +185,7 @@ def render(df: pd.DataFrame):
         st.markdown(f"#### Details for **{sup}**")
         dfp = dfs[dfs.SupplierName == sup]
         prod = (
-            dfp.groupby("ProductName")
+            dfp.groupby("ProductName", observed=True)
                .agg(
                    Revenue=("Revenue","sum"),
                    Cost   =("Cost",   "sum"),
@@ -243,7 +243,7 @@ def render(df: pd.DataFrame):
     # ───────────────────────────────────────────────────────────────
     st.subheader("🔍 Drill-down Table")
     detail = (
-        dfs.groupby(["SupplierName","CustomerName","ProductName"])
+        dfs.groupby(["SupplierName","CustomerName","ProductName"], observed=True)
            .agg(
              Revenue=("Revenue","sum"),
              Profit=("Profit","sum"),
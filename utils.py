@@ -79,7 +79,7 @@ def display_seasonality_heatmap(
 def rfm_scatter(df: pd.DataFrame, key: str) -> None:
     now = df.Date.max()
     rfm = (
-        df.groupby("CustomerName")
+        df.groupby("CustomerName", observed=True)
           .agg(
             Recency   = ("Date",    lambda x: (now - x.max()).days),
             Frequency = ("OrderId", "nunique"),
@@ -108,7 +108,7 @@ def rfm_scatter(df: pd.DataFrame, key: str) -> None:
 @st.cache_data
 def get_supplier_summary(df: pd.DataFrame) -> pd.DataFrame:
     sup = (
-        df.groupby("SupplierName")
+        df.groupby("SupplierName", observed=True)
           .agg(
             TotalRev  = ("Revenue","sum"),
             TotalProf = ("Profit",  "sum"),
@@ -122,7 +122,7 @@ def get_supplier_summary(df: pd.DataFrame) -> pd.DataFrame:
 @st.cache_data
 def get_monthly_supplier(df: pd.DataFrame) -> pd.DataFrame:
     return (
-        df.groupby([pd.Grouper(key="Date", freq="ME"), "SupplierName"])["Revenue"]
+        df.groupby([pd.Grouper(key="Date", freq="ME"), "SupplierName"], observed=True)["Revenue"]
           .sum()
           .reset_index()
     )
@@ -138,7 +138,7 @@ def compute_interpurchase(df: pd.DataFrame) -> pd.Series:
     """
     diffs = (
         df.sort_values(["CustomerName","Date"])
-          .groupby("CustomerName")["Date"]
+          .groupby("CustomerName", observed=True)["Date"]
           .diff()
           .dt.days
           .dropna()
@@ -161,14 +161,14 @@ def compute_volatility(
     # 1) build periodized time series
     ts = (
         df
-        .groupby([pd.Grouper(key="Date", freq=period), "ProductName"])[metric]
+        .groupby([pd.Grouper(key="Date", freq=period), "ProductName"], observed=True)[metric]
         .sum()
         .reset_index()
     )
     # 2) aggregate
     stats = (
         ts
-        .groupby("ProductName")[metric]
+        .groupby("ProductName", observed=True)[metric]
         .agg(mean="mean", std="std")
         .reset_index()
     )
@@ -187,7 +187,7 @@ def get_supplier_summary(df: pd.DataFrame) -> pd.DataFrame:
     Summarize supplier‐level Rev/Cost/Profit and compute margin.
     """
     sup = (
-        df.groupby("SupplierName")
+        df.groupby("SupplierName", observed=True)
           .agg(
             TotalRev   = ("Revenue", "sum"),
             TotalCost  = ("Cost",    "sum"),
@@ -209,7 +209,7 @@ def get_monthly_supplier(df: pd.DataFrame, metric: str = "Revenue") -> pd.DataFr
     Month‐by‐month totals for any supplier metric (Revenue, Cost, or Profit).
     """
     return (
-        df.groupby([pd.Grouper(key="Date", freq="M"), "SupplierName"])[metric]
+        df.groupby([pd.Grouper(key="Date", freq="M"), "SupplierName"], observed=True)[metric]
           .sum()
           .reset_index()
     )